@@ -1,18 +1,22 @@
+import io
 import os
 import sys
 import json
+import re
 import logging
 import asyncio
-import shutil
-import queue
+import gc
 import time
+import threading
 import urllib3
-import gc
-import uuid
-import zipfile
 import datetime
 import multiprocessing
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlparse
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from telegram import Update
 from telegram.ext import (
@@ -22,17 +26,19 @@ from telegram.ext import (
     ContextTypes,
     filters,
 )
-from pyrogram import Client as UserBotClient
 
 from lncrawl.core.app import App
-from lncrawl.core.sources import load_sources
+from lncrawl.core.sources import load_sources, prepare_crawler
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 logging.getLogger("pyrogram").setLevel(logging.WARNING)
 
 # --- CONFIGURATION ---
 TOKEN = os.getenv("TELEGRAM_TOKEN")
-THREADS_PER_NOVEL = 8
+MAX_CONCURRENT_NOVELS = int(os.getenv("MAX_CONCURRENT_NOVELS", "2"))
+MAX_TOTAL_THREADS = int(os.getenv("MAX_TOTAL_THREADS", "100"))
+# Novels scrape in separate processes, so the global cap is split evenly between them
+THREADS_PER_NOVEL = max(1, min(int(os.getenv("THREADS_PER_NOVEL", "8")), MAX_TOTAL_THREADS // MAX_CONCURRENT_NOVELS))
 
 # Group Configs (Must be -100xxxx format)
 TARGET_GROUP_ID = os.getenv("TARGET_GROUP_ID") 
@@ -47,6 +53,10 @@ API_ID = os.getenv("API_ID")
 API_HASH = os.getenv("API_HASH")
 SESSION_STRING = os.getenv("SESSION_STRING")
 USERBOT_THRESHOLD = 40.0 
+USERBOT_KEEPALIVE = 240
+TG_MESSAGES_PER_SECOND = 25
+STATE_FLUSH_DELAY = 2
+PROGRESS_EDIT_INTERVAL = 5
 
 DATA_DIR = os.getenv("DATA_DIR", "data")
 DOWNLOAD_DIR = os.path.join(DATA_DIR, "downloads")
@@ -60,55 +70,172 @@ logger = logging.getLogger(__name__)
 
 pending_uploads = {}
 
+# Sentinel the worker sends once it stops producing progress messages
+PROGRESS_DONE = None
+
+# Empty-novel failures that reach the bot as a plain Exception
+NULLCON_ERRORS = re.compile(r"list index out of range|IndexError|No chapters extracted|No chapters found")
+
+class AsyncRateLimiter:
+    """Token bucket allowing `rate` acquisitions per second across coroutines"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = None
+
+    async def __aenter__(self):
+        if self._lock is None: self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return self
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    async def __aexit__(self, *exc):
+        return False
+
+def dump_json(data):
+    """Serializes compact JSON bytes, with orjson when it is installed"""
+    if orjson: return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def atomic_write_json(path, data, durable=True):
+    """Writes JSON to a temp file and swaps it in, so a crash never leaves a truncated file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(dump_json(data))
+        # Soft state can skip the fsync; the rename alone still keeps it from being torn
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_json(path):
+    """Parses a JSON file, with orjson when it is installed"""
+    if orjson:
+        with open(path, 'rb') as f: return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f: return json.load(f)
+
+def merge_upload_into_queue(upload_path, queue_path, chat_id):
+    """Appends an uploaded URL list to the queue file and returns the number of URLs received"""
+    urls = list(dict.fromkeys(load_json(upload_path)))
+    try: queued = load_json(queue_path).get("urls", [])
+    except FileNotFoundError: queued = []
+    atomic_write_json(queue_path, {"chat_id": chat_id, "urls": list(dict.fromkeys(queued + urls))}, durable=False)
+    return len(urls)
+
+def remove_file(path):
+    try: os.remove(path)
+    except FileNotFoundError: pass
+
+def read_bytes(path):
+    with open(path, 'rb') as f: return f.read()
+
+def is_missing_body(chapter):
+    # strip() only copies the body when it has surrounding whitespace to remove
+    body = chapter.body
+    if not body or len(body) < 20: return True
+    if body[0].isspace() or body[-1].isspace(): return len(body.strip()) < 20
+    return False
+
+def pump_progress(progress_queue, loop, route):
+    """Blocks on the shared worker progress queue and hands each (url, text) to the event loop"""
+    while True:
+        url, text = progress_queue.get()
+        if url is None: return
+        loop.call_soon_threadsafe(route, url, text)
+
+# --- CRAWLER CACHE (Per Worker Process) ---
+crawler_cache = {}
+
+def reset_crawler(crawler, url):
+    """Clears the novel state a crawler collected so it can be reused"""
+    crawler.novel_url = url
+    crawler.last_soup_url = ""
+    crawler.novel_title = ""
+    crawler.novel_author = ""
+    crawler.novel_cover = None
+    crawler.is_rtl = False
+    crawler.novel_synopsis = ""
+    crawler.novel_tags = []
+    crawler.volumes = []
+    crawler.chapters = []
+    crawler.futures.clear()
+
+def size_crawler_pools(crawler):
+    """Matches the crawler's thread pool and connection pool to THREADS_PER_NOVEL"""
+    # Re-initializing also closes the session, so only do it when the size differs
+    if crawler.workers != THREADS_PER_NOVEL:
+        crawler.init_executor(THREADS_PER_NOVEL)
+    crawler.init_connection_pool(THREADS_PER_NOVEL)
+
+def get_cached_crawler(url):
+    """Returns this process's crawler for the url's host, creating it on first use"""
+    host = urlparse(url).hostname
+    crawler = crawler_cache.get(host)
+    if crawler is None:
+        crawler = crawler_cache[host] = prepare_crawler(url)
+        size_crawler_pools(crawler)
+    else:
+        reset_crawler(crawler, url)
+    return crawler
+
+def evict_cached_crawler(url):
+    crawler = crawler_cache.pop(urlparse(url).hostname, None)
+    if crawler: crawler.close()
+
 # --- WORKER FUNCTION (Global Scope for Multiprocessing) ---
-def scrape_logic_worker(url, progress_queue):
-    # Reload sources in the new process context
+# Shared pipe back to the bot, inherited by each pool process through worker_init
+progress_queue = None
+
+def worker_init(queue):
+    """Runs once per pool process, so sources are loaded before the first novel rather than per novel"""
+    global progress_queue
+    progress_queue = queue
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    logging.getLogger("pyrogram").setLevel(logging.WARNING)
     load_sources()
-    
+
+def scrape_logic_worker(url):
     app = App()
     try:
-        if progress_queue: progress_queue.put("🔍 Fetching info...")
+        if progress_queue: progress_queue.put((url, "🔍 Fetching info..."))
         
-        app.user_input = url
-        app.prepare_search()
+        app.crawler = get_cached_crawler(url)
         app.get_novel_info()
-        
-        if app.crawler: 
-            app.crawler.init_executor(THREADS_PER_NOVEL)
 
-        # Cover Image
-        if app.crawler.novel_cover:
-            try:
-                headers = {"Referer": "https://www.fanmtl.com/", "User-Agent": "Mozilla/5.0"}
-                response = app.crawler.scraper.get(app.crawler.novel_cover, headers=headers, timeout=15)
-                if response.status_code == 200:
-                    cover_path = os.path.abspath(os.path.join(app.output_path, 'cover.jpg'))
-                    with open(cover_path, 'wb') as f: f.write(response.content)
-                    app.book_cover = cover_path
-            except: pass
-
-        app.chapters = app.crawler.chapters[:]
+        app.chapters = app.crawler.chapters
         if not app.chapters:
-            raise Exception("No chapters extracted")
+            raise IndexError("No chapters extracted")
 
         app.pack_by_volume = False
         app.output_formats = {'epub': True}
         
         total = len(app.chapters)
-        if progress_queue: progress_queue.put(f"⬇️ Downloading {total} chapters...")
+        if progress_queue: progress_queue.put((url, f"⬇️ Downloading {total} chapters..."))
         
+        last_pct = -1
         for i, _ in enumerate(app.start_download()):
-            if i % 50 == 0 and progress_queue: 
-                progress_queue.put(f"🚀 {int(app.progress)}% ({i}/{total})")
+            pct = int(app.progress)
+            if pct != last_pct and progress_queue:
+                progress_queue.put((url, f"🚀 {pct}% ({i}/{total})"))
+                last_pct = pct
         
-        failed = [c for c in app.chapters if not c.body or len(c.body.strip()) < 20]
+        failed = [c for c in app.chapters if is_missing_body(c)]
         if failed:
-            if progress_queue: progress_queue.put(f"⚠️ Fixing {len(failed)} chapters...")
-            app.crawler.download_chapters(failed)
-            failed = [c for c in app.chapters if not c.body or len(c.body.strip()) < 20]
+            if progress_queue: progress_queue.put((url, f"⚠️ Fixing {len(failed)} chapters..."))
+            # download_chapters is a generator; nothing is fetched until it is drained
+            for _ in app.crawler.download_chapters(failed): pass
+            failed = [c for c in app.chapters if is_missing_body(c)]
             for c in failed: c.body = f"<h1>Chapter {c.id}</h1><p><i>[Content Missing]</i></p>"
 
-        if progress_queue: progress_queue.put("📦 Binding...")
+        if progress_queue: progress_queue.put((url, "📦 Binding..."))
         
         try:
             for fmt, f in app.bind_books(): return f
@@ -117,16 +244,24 @@ def scrape_logic_worker(url, progress_queue):
         return None
 
     except Exception as e:
+        # Don't hand a crawler in an unknown state to the next novel
+        evict_cached_crawler(url)
         raise e
     finally: 
+        # The cached crawler outlives this novel; only drop its per-novel data
+        if app.crawler:
+            reset_crawler(app.crawler, "")
+            app.crawler = None
         app.destroy()
-        gc.collect()
+        if progress_queue: progress_queue.put((url, PROGRESS_DONE))
 
 class NovelBot:
     def __init__(self):
         # Use ProcessPoolExecutor for CPU isolation
-        self.executor = ProcessPoolExecutor(max_workers=2)
-        self.manager = multiprocessing.Manager()
+        # A plain pipe handed over at fork time; no Manager process proxying every put/get
+        self.progress_queue = multiprocessing.Queue()
+        self.progress_routes = {}
+        self.executor = ProcessPoolExecutor(max_workers=MAX_CONCURRENT_NOVELS, initializer=worker_init, initargs=(self.progress_queue,))
         
         self.userbot = None
         self.bot_username = None 
@@ -143,124 +278,157 @@ class NovelBot:
         self.backup_topic_id = None
 
         self.files = {}
+        self.queue_wakeup = None
+        # Bumped before every upload merge, so the drainer never deletes a queue file it has not read
+        self.queue_generation = 0
+
+        # State files waiting for the debounced flush
+        self.dirty = set()
+        self.flush_handle = None
+
+        # Telegram allows ~30 msg/s per bot; stay below it and coalesce edits
+        self.tg_limiter = AsyncRateLimiter(TG_MESSAGES_PER_SECOND)
+        self.pending_edits = {}
+
+        # Finished epubs wait here so uploads never hold up the next scrape
+        self.upload_queue = None
 
     def get_file_path(self, name):
         """Generates a namespaced file path: data/name_BotUsername.json"""
         return os.path.join(DATA_DIR, f"{name}_{self.bot_username}.json")
 
     def load_data(self):
-        """Loads data with verbose error logging and migration support"""
+        """Loads data with verbose error logging and migration support (runs off the event loop)"""
         
+        # Missing files are the normal first-run case, so just open and catch FileNotFoundError
+
         # --- 1. Load Processed Novels ---
-        if os.path.exists(self.files['processed']):
-            try:
-                with open(self.files['processed'], 'r') as f: self.processed = set(json.load(f))
-            except Exception as e: logger.error(f"⚠️ Load Processed Failed: {e}")
-        elif os.path.exists(os.path.join(DATA_DIR, "processed.json")):
+        try:
+            self.processed = set(load_json(self.files['processed']))
+        except FileNotFoundError:
             try:
-                with open(os.path.join(DATA_DIR, "processed.json"), 'r') as f: 
-                    self.processed = set(json.load(f))
+                self.processed = set(load_json(os.path.join(DATA_DIR, "processed.json")))
+                # Persist under the namespaced name so later boots never reach this branch
+                self.dirty.add('processed')
                 logger.info("♻️ Migrated processed.json")
+            except FileNotFoundError: pass
             except Exception as e: logger.error(f"⚠️ Legacy Processed Load Failed: {e}")
+        except Exception as e: logger.error(f"⚠️ Load Processed Failed: {e}")
 
         # --- 2. Load Errors (Legacy) ---
-        if os.path.exists(self.files['errors']):
-            try:
-                with open(self.files['errors'], 'r') as f: self.errors = json.load(f)
-            except Exception as e: logger.error(f"⚠️ Load Errors Failed: {e}")
+        try:
+            self.errors = load_json(self.files['errors'])
+        except FileNotFoundError: pass
+        except Exception as e: logger.error(f"⚠️ Load Errors Failed: {e}")
 
         # --- 3. Load Null Content ---
-        if os.path.exists(self.files['nullcon']):
-            try:
-                with open(self.files['nullcon'], 'r') as f: self.nullcon = set(json.load(f))
-            except Exception as e: logger.error(f"⚠️ Load Nullcon Failed: {e}")
+        try:
+            self.nullcon = set(load_json(self.files['nullcon']))
+        except FileNotFoundError: pass
+        except Exception as e: logger.error(f"⚠️ Load Nullcon Failed: {e}")
 
         # --- 4. Load Genfail ---
-        if os.path.exists(self.files['genfail']):
-            try:
-                with open(self.files['genfail'], 'r') as f: self.genfail = set(json.load(f))
-            except Exception as e: logger.error(f"⚠️ Load Genfail Failed: {e}")
+        try:
+            self.genfail = set(load_json(self.files['genfail']))
+        except FileNotFoundError: pass
+        except Exception as e: logger.error(f"⚠️ Load Genfail Failed: {e}")
 
         # --- 5. Load Topics (Critical) ---
         if not self.target_topic_id or not self.error_topic_id:
             loaded = False
-            if os.path.exists(self.files['topics']):
-                try:
-                    with open(self.files['topics'], 'r') as f:
-                        data = json.load(f)
-                        if not self.target_topic_id: self.target_topic_id = data.get("target_topic_id")
-                        if not self.error_topic_id: self.error_topic_id = data.get("error_topic_id")
-                        self.backup_topic_id = data.get("backup_topic_id")
-                        loaded = True
-                        logger.info(f"✅ Loaded Topics from {os.path.basename(self.files['topics'])}")
-                except Exception as e: 
-                    logger.error(f"❌ CRITICAL: Found {self.files['topics']} but could not read it: {e}")
+            try:
+                data = load_json(self.files['topics'])
+                if not self.target_topic_id: self.target_topic_id = data.get("target_topic_id")
+                if not self.error_topic_id: self.error_topic_id = data.get("error_topic_id")
+                self.backup_topic_id = data.get("backup_topic_id")
+                loaded = True
+                logger.info(f"✅ Loaded Topics from {os.path.basename(self.files['topics'])}")
+            except FileNotFoundError: pass
+            except Exception as e: 
+                logger.error(f"❌ CRITICAL: Found {self.files['topics']} but could not read it: {e}")
 
             if not loaded:
                 legacy_path = os.path.join(DATA_DIR, "topics.json")
-                if os.path.exists(legacy_path):
-                    try:
-                        with open(legacy_path, 'r') as f:
-                            data = json.load(f)
-                            if not self.target_topic_id: self.target_topic_id = data.get("target_topic_id")
-                            if not self.error_topic_id: self.error_topic_id = data.get("error_topic_id")
-                            self.backup_topic_id = data.get("backup_topic_id")
-                            logger.info(f"♻️ Migrated Topics from legacy topics.json")
-                    except Exception as e: 
-                        logger.error(f"❌ CRITICAL: Found legacy topics.json but could not read it: {e}")
+                try:
+                    data = load_json(legacy_path)
+                    if not self.target_topic_id: self.target_topic_id = data.get("target_topic_id")
+                    if not self.error_topic_id: self.error_topic_id = data.get("error_topic_id")
+                    self.backup_topic_id = data.get("backup_topic_id")
+                    logger.info(f"♻️ Migrated Topics from legacy topics.json")
+                    self.save_topics()
+                except FileNotFoundError: pass
+                except Exception as e: 
+                    logger.error(f"❌ CRITICAL: Found legacy topics.json but could not read it: {e}")
 
     def save_topics(self):
         try:
-            with open(self.files['topics'], 'w') as f:
-                json.dump({
-                    "target_topic_id": self.target_topic_id,
-                    "error_topic_id": self.error_topic_id,
-                    "backup_topic_id": self.backup_topic_id
-                }, f, indent=2)
+            atomic_write_json(self.files['topics'], {
+                "target_topic_id": self.target_topic_id,
+                "error_topic_id": self.error_topic_id,
+                "backup_topic_id": self.backup_topic_id
+            })
             logger.info(f"💾 Topics Saved to {os.path.basename(self.files['topics'])}")
         except Exception as e:
             logger.error(f"❌ Could not save topics: {e}")
 
     def save_success(self, url):
-        self.processed.add(url)
-        if url in self.errors: del self.errors[url]
+        # Only rewrite the files whose membership actually changed
+        if url not in self.processed:
+            self.processed.add(url)
+            self.mark_dirty('processed')
+        if url in self.errors:
+            del self.errors[url]
+            self.mark_dirty('errors')
         
         # Remove from bad lists
-        if url in self.nullcon: self.nullcon.remove(url)
-        if url in self.genfail: self.genfail.remove(url)
-        
-        # Save Processed
-        try:
-            with open(self.files['processed'], 'w') as f: 
-                json.dump(list(self.processed), f, indent=2)
-        except Exception as e: logger.error(f"⚠️ Save Processed Failed: {e}")
-        
-        self.save_nullcon()
-        self.save_genfail()
+        if url in self.nullcon:
+            self.nullcon.remove(url)
+            self.mark_dirty('nullcon')
+        if url in self.genfail:
+            self.genfail.remove(url)
+            self.mark_dirty('genfail')
 
     def save_errors(self):
-        try:
-            with open(self.files['errors'], 'w') as f: 
-                json.dump(self.errors, f, indent=2)
-        except Exception as e: logger.error(f"⚠️ Save Errors Failed: {e}")
+        self.mark_dirty('errors')
 
     def save_nullcon(self):
-        try:
-            with open(self.files['nullcon'], 'w') as f: 
-                json.dump(list(self.nullcon), f, indent=2)
-        except Exception as e: logger.error(f"⚠️ Save Nullcon Failed: {e}")
+        self.mark_dirty('nullcon')
 
     def save_genfail(self):
-        try:
-            with open(self.files['genfail'], 'w') as f: 
-                json.dump(list(self.genfail), f, indent=2)
-        except Exception as e: logger.error(f"⚠️ Save Genfail Failed: {e}")
+        self.mark_dirty('genfail')
+
+    def mark_dirty(self, name):
+        """Schedules a state file write; a burst of changes is flushed together"""
+        self.dirty.add(name)
+        if self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(STATE_FLUSH_DELAY, self.flush_state)
+
+    def flush_state(self):
+        """Writes every state file changed since the last flush"""
+        if self.flush_handle:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        dirty, self.dirty = self.dirty, set()
+        for name in dirty:
+            value = getattr(self, name)
+            try:
+                atomic_write_json(self.files[name], list(value) if isinstance(value, set) else value)
+            except Exception as e: logger.error(f"⚠️ Save {name.title()} Failed: {e}")
 
     def save_error(self, url, error_msg):
         self.errors[url] = str(error_msg)
         self.save_errors()
         
     async def post_init(self, application: Application):
+        # Headroom for off-loop file work; the progress pump has its own thread
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=4, thread_name_prefix="bot_io")
+        )
+        threading.Thread(
+            target=pump_progress, args=(self.progress_queue, asyncio.get_running_loop(), self.route_progress),
+            name="progress_pump", daemon=True
+        ).start()
+
         me = await application.bot.get_me()
         self.bot_username = me.username
         logger.info(f"🤖 Identity Verified: @{self.bot_username}")
@@ -275,32 +443,32 @@ class NovelBot:
             'nwerror': self.get_file_path("nwerror")
         }
 
-        self.load_data()
+        await asyncio.get_running_loop().run_in_executor(None, self.load_data)
+        if self.dirty: self.flush_state()
+        # Loaded state lives for the whole run; keep it out of every future collection
+        gc.freeze()
 
         if TARGET_GROUP_ID and ERROR_GROUP_ID:
-            try:
-                if not self.target_topic_id:
-                    logger.info("🆕 Creating Target Topic...")
-                    topic = await application.bot.create_forum_topic(chat_id=TARGET_GROUP_ID, name=f"📚 {self.bot_username} Novels")
-                    self.target_topic_id = topic.message_thread_id
-                    self.save_topics()
-                
-                if not self.error_topic_id:
-                    logger.info("🆕 Creating Error/Log Topic...")
-                    topic = await application.bot.create_forum_topic(chat_id=ERROR_GROUP_ID, name=f"🛠 {self.bot_username} Logs")
-                    self.error_topic_id = topic.message_thread_id
-                    self.save_topics()
-
-                if not self.backup_topic_id:
-                    logger.info("🆕 Creating Backup Topic...")
-                    topic = await application.bot.create_forum_topic(chat_id=ERROR_GROUP_ID, name=f"🗄️ {self.bot_username} Backup")
-                    self.backup_topic_id = topic.message_thread_id
-                    self.save_topics()
-            except Exception as e:
-                logger.error(f"❌ Failed to configure topics: {e}")
+            missing = [(attr, chat_id, name) for attr, chat_id, name in (
+                ('target_topic_id', TARGET_GROUP_ID, f"📚 {self.bot_username} Novels"),
+                ('error_topic_id', ERROR_GROUP_ID, f"🛠 {self.bot_username} Logs"),
+                ('backup_topic_id', ERROR_GROUP_ID, f"🗄️ {self.bot_username} Backup"),
+            ) if not getattr(self, attr)]
+            if missing:
+                logger.info(f"🆕 Creating {len(missing)} Topic(s)...")
+                # Independent API calls, so create them concurrently and save once
+                topics = await asyncio.gather(
+                    *(application.bot.create_forum_topic(chat_id=chat_id, name=name) for _, chat_id, name in missing),
+                    return_exceptions=True)
+                for (attr, _, _), topic in zip(missing, topics):
+                    if isinstance(topic, Exception): logger.error(f"❌ Failed to configure topics: {topic}")
+                    else: setattr(self, attr, topic.message_thread_id)
+                self.save_topics()
 
         if SESSION_STRING and API_ID:
             try:
+                # Only load pyrogram when a userbot is actually configured
+                from pyrogram import Client as UserBotClient
                 self.userbot = UserBotClient(
                     "uploader",
                     api_id=int(API_ID),
@@ -309,71 +477,112 @@ class NovelBot:
                     in_memory=True
                 )
                 await self.userbot.start()
-                logger.info("✅ Userbot Connected!")
+                # Warm up the DC connection so the first large upload skips the handshake
+                me = await self.userbot.get_me()
+                logger.info(f"✅ Userbot Connected as {me.first_name}!")
+                asyncio.create_task(self.userbot_keepalive())
             except Exception as e:
                 logger.error(f"❌ Userbot Failed: {e}")
 
         asyncio.create_task(self.backup_loop(application.bot))
         
+        # Upload Pipeline (bounded so finished epubs can't pile up on disk)
+        self.upload_queue = asyncio.Queue(maxsize=MAX_CONCURRENT_NOVELS * 2)
+        asyncio.create_task(self.upload_worker(application.bot))
+
         # Process Queue
-        if os.path.exists(self.files['queue']):
-            try:
-                with open(self.files['queue'], 'r') as f: data = json.load(f)
-                urls = data.get("urls", [])
-                
-                # Filter: processed, nullcon, genfail are skipped.
-                to_process = [
-                    u for u in urls 
-                    if u not in self.processed 
-                    and u not in self.nullcon 
-                    and u not in self.genfail
-                ]
-                
-                if to_process:
-                    await self.send_log(application.bot, f"🔄 **Restarted**\nResuming {len(to_process)} novels...")
-                    asyncio.create_task(self.process_queue(to_process, application.bot))
-                elif urls:
-                     await self.send_log(application.bot, "ℹ️ Queue exists but all novels processed/skipped. Clearing.")
-                     os.remove(self.files['queue'])
+        self.queue_wakeup = asyncio.Event()
+        asyncio.create_task(self.queue_worker(application.bot))
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(None, load_json, self.files['queue'])
+            urls = data.get("urls", [])
+            
+            # process_queue skips processed/nullcon/genfail and clears a finished queue
+            if urls:
+                await self.send_log(application.bot, f"🔄 **Restarted**\nResuming queue of {len(urls)} novels...")
+                self.queue_wakeup.set()
 
-            except Exception as e:
-                logger.error(f"❌ Error processing queue file: {e}")
-        else:
+        except FileNotFoundError:
             logger.info("ℹ️ No pending queue found.")
+        except Exception as e:
+            logger.error(f"❌ Error processing queue file: {e}")
+
+    async def post_shutdown(self, application: Application):
+        self.flush_state()
+        if self.userbot:
+            try: await self.userbot.stop()
+            except: pass
+        self.progress_queue.put((None, PROGRESS_DONE))
+
+    def route_progress(self, url, text):
+        """Delivers a worker progress message to the novel that is waiting on it"""
+        aio_queue = self.progress_routes.get(url)
+        if aio_queue: aio_queue.put_nowait(text)
 
     async def send_log(self, bot, text, edit_msg=None):
         if ERROR_GROUP_ID and self.error_topic_id:
             try:
                 if edit_msg:
-                    return await edit_msg.edit_text(text)
-                return await bot.send_message(
-                    chat_id=ERROR_GROUP_ID, 
-                    message_thread_id=self.error_topic_id, 
-                    text=text
-                )
+                    # Latest text wins: the edit already in flight for this message sends it next
+                    key = (edit_msg.chat_id, edit_msg.message_id)
+                    waiting = key in self.pending_edits
+                    self.pending_edits[key] = text
+                    if waiting: return edit_msg
+                    try:
+                        while True:
+                            async with self.tg_limiter:
+                                sent = self.pending_edits[key]
+                                result = await edit_msg.edit_text(sent)
+                            if self.pending_edits[key] == sent: return result
+                    finally:
+                        self.pending_edits.pop(key, None)
+                async with self.tg_limiter:
+                    return await bot.send_message(
+                        chat_id=ERROR_GROUP_ID, 
+                        message_thread_id=self.error_topic_id, 
+                        text=text
+                    )
             except: pass 
         return None
 
+    async def userbot_keepalive(self):
+        """Pings the userbot periodically so large uploads start on a warm session"""
+        while True:
+            await asyncio.sleep(USERBOT_KEEPALIVE)
+            try: await self.userbot.get_me()
+            except Exception as e:
+                logger.warning(f"⚠️ Userbot ping failed, reconnecting: {e}")
+                try: await self.userbot.restart()
+                except Exception as e: logger.error(f"❌ Userbot Reconnect Failed: {e}")
+
     async def backup_loop(self, bot):
         await asyncio.sleep(60)
         while True:
             await self.perform_backup(bot)
             await asyncio.sleep(86400)
 
+    def build_backup_zip(self, paths):
+        """Zips whichever state files exist in memory (runs in a worker thread), or returns None"""
+        import zipfile
+        buf = io.BytesIO()
+        written = 0
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            for path in paths:
+                # The queue file is removed after each batch, possibly while this runs
+                try: zf.write(path, os.path.basename(path))
+                except FileNotFoundError: continue
+                written += 1
+        return buf.getvalue() if written else None
+
     async def perform_backup(self, bot):
         if not ERROR_GROUP_ID or not self.backup_topic_id: return
         try:
             timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M")
             zip_name = f"backup_{self.bot_username}_{timestamp}.zip"
-            zip_path = os.path.join(DATA_DIR, zip_name)
-            files_to_backup = [f for f in os.listdir(DATA_DIR) if f.endswith('.json') and self.bot_username in f]
-            if not files_to_backup: return
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for file_name in files_to_backup:
-                    zf.write(os.path.join(DATA_DIR, file_name), file_name)
-            with open(zip_path, 'rb') as f:
-                await bot.send_document(chat_id=ERROR_GROUP_ID, message_thread_id=self.backup_topic_id, document=f, caption=f"🗄️ Backup {timestamp}")
-            if os.path.exists(zip_path): os.remove(zip_path)
+            # Compress off the event loop so progress edits and handlers keep running
+            blob = await asyncio.get_running_loop().run_in_executor(None, self.build_backup_zip, list(self.files.values()))
+            if not blob: return
+            await bot.send_document(chat_id=ERROR_GROUP_ID, message_thread_id=self.backup_topic_id, document=io.BytesIO(blob), filename=zip_name, caption=f"🗄️ Backup {timestamp}")
             logger.info("✅ Backup uploaded successfully")
         except Exception as e:
             logger.error(f"Backup Failed: {e}")
@@ -386,7 +595,7 @@ class NovelBot:
             print("❌ FATAL ERROR: TELEGRAM_TOKEN missing!")
             sys.exit(1)
 
-        app = Application.builder().token(TOKEN).post_init(self.post_init).build()
+        app = Application.builder().token(TOKEN).post_init(self.post_init).post_shutdown(self.post_shutdown).build()
         app.add_handler(CommandHandler("start", self.cmd_start))
         app.add_handler(CommandHandler("reset", self.cmd_reset))
         app.add_handler(CommandHandler("backup", self.cmd_force_backup))
@@ -404,7 +613,7 @@ class NovelBot:
         self.genfail = set()
         self.nwerror = set()
         for f in [self.files['processed'], self.files['nullcon'], self.files['genfail'], self.files['nwerror'], self.files['queue']]:
-            if os.path.exists(f): os.remove(f)
+            remove_file(f)
         await update.message.reply_text("🗑️ History Reset.")
 
     async def cmd_force_backup(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -423,73 +632,167 @@ class NovelBot:
         temp_path = os.path.join(DATA_DIR, "temp.json")
         await file.download_to_drive(temp_path)
         try:
-            with open(temp_path, 'r', encoding='utf-8') as f: urls = json.load(f)
-            with open(self.files['queue'], 'w') as f:
-                json.dump({"chat_id": update.effective_chat.id, "urls": urls}, f, indent=2)
-            await update.message.reply_text(f"✅ Received {len(urls)} novels. Check Log Group for progress.")
-            await self.process_queue(urls, context.bot)
+            # Append to whatever is still queued; parsing big lists off the loop keeps handlers responsive
+            self.queue_generation += 1
+            received = await asyncio.get_running_loop().run_in_executor(
+                None, merge_upload_into_queue, temp_path, self.files['queue'], update.effective_chat.id)
+            self.queue_wakeup.set()
+            await update.message.reply_text(f"✅ Received {received} novels. Check Log Group for progress.")
         except Exception as e:
             logger.error(f"File Error: {e}")
             await update.message.reply_text("❌ Invalid JSON")
         finally:
-            if os.path.exists(temp_path): os.remove(temp_path)
+            remove_file(temp_path)
 
-    async def process_queue(self, urls, bot):
-        gc.collect()
-        to_process = []
-        skipped = 0
-        
-        for u in urls:
-            if u in self.processed or u in self.nullcon or u in self.genfail:
-                skipped += 1
+    async def queue_worker(self, bot):
+        """Single long-lived drainer, woken whenever the queue file gets new work"""
+        while True:
+            await self.queue_wakeup.wait()
+            self.queue_wakeup.clear()
+            generation = self.queue_generation
+            try:
+                data = await asyncio.get_running_loop().run_in_executor(None, load_json, self.files['queue'])
+                await self.process_queue(data.get("urls", []), bot)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.error(f"❌ Queue worker error: {e}")
                 continue
-            to_process.append(u)
+            # Keep the file if another upload started merging into it during this batch
+            if self.queue_generation == generation:
+                remove_file(self.files['queue'])
+
+    async def process_queue(self, urls, bot):
+        # Drop duplicate URLs in the upload, then filter against the history sets in place
+        processed, nullcon, genfail = self.processed, self.nullcon, self.genfail
+        to_process = [u for u in dict.fromkeys(urls) if u not in processed and u not in nullcon and u not in genfail]
+        skipped = len(urls) - len(to_process)
 
         if not to_process:
-            if os.path.exists(self.files['queue']): os.remove(self.files['queue'])
             await self.send_log(bot, f"✅ **Queue Complete**\n(Skipped: {skipped} already processed/failed)")
             return
 
         await self.send_log(bot, f"📥 **Starting Batch**\nQueue: {len(to_process)}\n(Skipped: {skipped})")
         
-        for url in to_process:
-            # Double check
-            if url in self.processed: continue
-            await self.process_novel(url, bot)
-            gc.collect()
+        # Workers share one iterator, so each URL is taken exactly once
+        pending = iter(to_process)
+        async def worker():
+            for url in pending:
+                # Double check
+                if url in self.processed: continue
+                await self.process_novel(url, bot)
         
+        workers = min(MAX_CONCURRENT_NOVELS, len(to_process))
+        results = await asyncio.gather(*(worker() for _ in range(workers)), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception): logger.error(f"❌ Queue worker error: {result}")
+        
+        await self.upload_queue.join()
+        self.flush_state()
         await self.send_log(bot, "✅ **All Tasks Finished**")
-        if os.path.exists(self.files['queue']): os.remove(self.files['queue'])
+
+    async def upload_worker(self, bot):
+        """Single long-lived uploader draining finished epubs in order"""
+        while True:
+            url, epub_path, caption, file_size_mb = await self.upload_queue.get()
+            try:
+                await self.upload_epub(bot, url, epub_path, caption, file_size_mb)
+            except Exception as e:
+                await self.send_log(bot, f"❌ **Error:** {e}\n{url}")
+            finally:
+                remove_file(epub_path)
+                self.upload_queue.task_done()
+
+    async def upload_epub(self, bot, url, epub_path, caption, file_size_mb):
+        dest_chat_id = TARGET_GROUP_ID if TARGET_GROUP_ID else ERROR_GROUP_ID
+        dest_topic_id = self.target_topic_id
+
+        if not dest_chat_id or not dest_topic_id:
+            await self.send_log(bot, f"❌ Configuration Error: Target Group/Topic missing for {url}")
+            return
+
+        if file_size_mb > USERBOT_THRESHOLD and self.userbot:
+            prog_msg = await self.send_log(bot, f"🚀 Uploading {file_size_mb:.1f}MB via Userbot...")
+            try:
+                async def upload():
+                    await self.userbot.send_document(
+                        chat_id=int(dest_chat_id),
+                        document=epub_path,
+                        caption=caption,
+                        message_thread_id=dest_topic_id
+                    )
+                try: await upload()
+                except ConnectionError:
+                    # Dropped session: reconnect once and retry rather than failing the novel
+                    await self.userbot.restart()
+                    await upload()
+                await prog_msg.delete()
+                self.save_success(url)
+            except Exception as e:
+                await self.send_log(bot, f"❌ Userbot Upload Failed: {e}", edit_msg=prog_msg)
+        else:
+            if file_size_mb >= 50:
+                await self.send_log(bot, f"❌ File {file_size_mb:.1f}MB exceeds 50MB limit and Userbot is not active/configured.")
+                self.save_error(url, "File > 50MB & No Userbot")
+            else:
+                # PTB reads file objects synchronously; load the epub off the loop instead
+                epub_data = await asyncio.get_running_loop().run_in_executor(None, read_bytes, epub_path)
+                await bot.send_document(
+                    chat_id=dest_chat_id,
+                    message_thread_id=dest_topic_id,
+                    document=epub_data,
+                    filename=os.path.basename(epub_path),
+                    caption=caption
+                )
+                self.save_success(url)
+
+    async def relay_progress(self, bot, status_msg, aio_queue, future):
+        """Edits the status message with the newest progress, at most once per interval"""
+        last_text = ""
+        latest = None
+        next_edit = 0
+        while True:
+            if latest is None:
+                timeout = PROGRESS_EDIT_INTERVAL
+            else:
+                timeout = max(0, next_edit - time.monotonic())
+            try:
+                text = await asyncio.wait_for(aio_queue.get(), timeout=timeout)
+                # Collapse a burst of messages down to the newest one
+                while text is not PROGRESS_DONE and not aio_queue.empty():
+                    text = aio_queue.get_nowait()
+                if text is PROGRESS_DONE: return
+                if text != last_text: latest = text
+            except asyncio.TimeoutError:
+                if latest is None and future.done(): return
+            if latest is not None and time.monotonic() >= next_edit:
+                await self.send_log(bot, latest, edit_msg=status_msg)
+                last_text, latest = latest, None
+                next_edit = time.monotonic() + PROGRESS_EDIT_INTERVAL
+
+    async def mark_nullcon(self, bot, url, status_msg):
+        self.nullcon.add(url)
+        self.save_nullcon()
+        await self.send_log(bot, f"⚠️ **Null Content:** {url}", edit_msg=status_msg)
 
     async def process_novel(self, url: str, bot):
         status_msg = await self.send_log(bot, f"⏳ **Processing:** {url}")
         
-        progress_queue = self.manager.Queue()
         loop = asyncio.get_running_loop()
-        start_time = time.time()
-        
+        start_time = time.monotonic()
+
+        # The progress pump routes this url's messages here
+        aio_queue = self.progress_routes[url] = asyncio.Queue()
+
         # ONE SHOT execution
-        future = loop.run_in_executor(self.executor, scrape_logic_worker, url, progress_queue)
-        
-        last_text = ""
-        last_update = 0
-        
-        while not future.done():
-            try:
-                try:
-                    text = progress_queue.get_nowait()
-                    if text != last_text and (time.time() - last_update) > 5:
-                        try: 
-                            await self.send_log(bot, text, edit_msg=status_msg)
-                            last_text = text; last_update = time.time()
-                        except: pass
-                except queue.Empty: pass
-                await asyncio.sleep(0.5)
-            except: await asyncio.sleep(0.5)
+        future = loop.run_in_executor(self.executor, scrape_logic_worker, url)
+
+        try: await self.relay_progress(bot, status_msg, aio_queue, future)
+        finally: self.progress_routes.pop(url, None)
 
         try:
             epub_path = await future
-            duration = int(time.time() - start_time)
+            duration = int(time.monotonic() - start_time)
             
             if epub_path and os.path.exists(epub_path):
                 # --- SUCCESS ---
@@ -497,57 +800,24 @@ class NovelBot:
                 caption = f"📕 {os.path.basename(epub_path)}\n📦 {file_size_mb:.1f}MB | ⏱️ {duration}s"
                 try: await status_msg.delete()
                 except: pass
-                
-                dest_chat_id = TARGET_GROUP_ID if TARGET_GROUP_ID else ERROR_GROUP_ID
-                dest_topic_id = self.target_topic_id
-
-                if not dest_chat_id or not dest_topic_id:
-                    await self.send_log(bot, f"❌ Configuration Error: Target Group/Topic missing for {url}")
-                    return
 
-                if file_size_mb > USERBOT_THRESHOLD and self.userbot:
-                    prog_msg = await self.send_log(bot, f"🚀 Uploading {file_size_mb:.1f}MB via Userbot...")
-                    try:
-                        await self.userbot.send_document(
-                            chat_id=int(dest_chat_id),
-                            document=epub_path,
-                            caption=caption,
-                            message_thread_id=dest_topic_id
-                        )
-                        await prog_msg.delete()
-                        self.save_success(url)
-                    except Exception as e:
-                        await self.send_log(bot, f"❌ Userbot Upload Failed: {e}", edit_msg=prog_msg)
-                else:
-                    if file_size_mb >= 50:
-                        await self.send_log(bot, f"❌ File {file_size_mb:.1f}MB exceeds 50MB limit and Userbot is not active/configured.")
-                        self.save_error(url, "File > 50MB & No Userbot")
-                    else:
-                        with open(epub_path, 'rb') as f:
-                            await bot.send_document(
-                                chat_id=dest_chat_id,
-                                message_thread_id=dest_topic_id,
-                                document=f,
-                                caption=caption
-                            )
-                        self.save_success(url)
-
-                os.remove(epub_path)
+                # Hand off to the uploader; waits only when the upload backlog is full
+                await self.upload_queue.put((url, epub_path, caption, file_size_mb))
             else:
                 # Genfail (No file)
                 self.genfail.add(url)
                 self.save_genfail()
                 await self.send_log(bot, f"❌ Gen Failed: {url}", edit_msg=status_msg)
 
+        except IndexError:
+            # Nullcon (IndexError / Empty); re-raised in the parent as the same type
+            await self.mark_nullcon(bot, url, status_msg)
+
         except Exception as e:
-            err_msg = str(e)
-            
-            # Nullcon (IndexError / Empty)
-            if "list index out of range" in err_msg or "IndexError" in err_msg or "No chapters extracted" in err_msg or "No chapters found" in err_msg:
-                self.nullcon.add(url)
-                self.save_nullcon()
-                await self.send_log(bot, f"⚠️ **Null Content:** {url}", edit_msg=status_msg)
-            
+            # lncrawl reports an empty novel as a plain Exception, so that case still needs the message
+            if NULLCON_ERRORS.search(str(e)):
+                await self.mark_nullcon(bot, url, status_msg)
+
             # Network/Other (Not Saved)
             else:
                 await self.send_log(bot, f"❌ **Error:** {e}\n{url}", edit_msg=status_msg)
@@ -131,6 +131,9 @@ class CloudScraper(Session):
         self.server_hostname = kwargs.pop('server_hostname', None)
         self.ssl_context = kwargs.pop('ssl_context', None)
 
+        # HTTPAdapter options (pool size, retries) kept across cipher rotations
+        self.adapter_options = kwargs.pop('adapter_options', {})
+
         # Aborter
         self.signal = kwargs.pop('signal', Event())
 
@@ -211,7 +214,8 @@ class CloudScraper(Session):
                 ecdhCurve=self.ecdhCurve,
                 server_hostname=self.server_hostname,
                 source_address=self.source_address,
-                ssl_context=self.ssl_context
+                ssl_context=self.ssl_context,
+                **self.adapter_options
             )
         )
 
@@ -600,7 +604,8 @@ class CloudScraper(Session):
                             ecdhCurve=self.ecdhCurve,
                             server_hostname=self.server_hostname,
                             source_address=self.source_address,
-                            ssl_context=self.ssl_context
+                            ssl_context=self.ssl_context,
+                            **self.adapter_options
                         )
                     )
 
@@ -614,6 +619,26 @@ class CloudScraper(Session):
 
     # ------------------------------------------------------------------------------- #
 
+    def configure_adapter(self, **options):
+        """
+        Set HTTPAdapter options (e.g. pool_maxsize, max_retries) on the HTTPS adapter,
+        keeping them on every adapter mounted later by cipher rotation
+        """
+        self.adapter_options.update(options)
+        self.mount(
+            'https://',
+            CipherSuiteAdapter(
+                cipherSuite=self.cipherSuite,
+                ecdhCurve=self.ecdhCurve,
+                server_hostname=self.server_hostname,
+                source_address=self.source_address,
+                ssl_context=self.ssl_context,
+                **self.adapter_options
+            )
+        )
+
+    # ------------------------------------------------------------------------------- #
+
     @classmethod
     def create_scraper(cls, sess=None, **kwargs):
         """
@@ -7,9 +7,10 @@ from typing import Any, Callable, Dict, MutableMapping, Optional, Tuple, Union
 from urllib.parse import ParseResult, urlparse
 
 from bs4 import BeautifulSoup
-from ..cloudscraper import create_scraper
+from ..cloudscraper import CloudScraper, create_scraper
 from PIL import Image, UnidentifiedImageError
 from requests import Response, Session
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ProxyError
 from requests.structures import CaseInsensitiveDict
 from tenacity import (RetryCallState, retry, retry_if_exception_type,
@@ -109,6 +110,18 @@ class Scraper(TaskManager, SoupMaker):
             logger.exception("Failed to initialize cloudscraper")
             self.scraper = session or Session()
 
+    def init_connection_pool(self, size: int, max_retries: Optional[Any] = None) -> None:
+        """Sizes the session's connection pools to `size`, keeping the current retry policy unless given"""
+        if max_retries is None:
+            max_retries = self.scraper.get_adapter("https://").max_retries
+        options = dict(pool_connections=size, pool_maxsize=size, max_retries=max_retries)
+        self.scraper.mount("http://", HTTPAdapter(**options))
+        if isinstance(self.scraper, CloudScraper):
+            # cloudscraper mounts a new https adapter on every cipher rotation, so it has to carry the options
+            self.scraper.configure_adapter(**options)
+        else:
+            self.scraper.mount("https://", HTTPAdapter(**options))
+
     # ------------------------------------------------------------------------- #
     # Internal methods
     # ------------------------------------------------------------------------- #
@@ -1,5 +1,4 @@
 import gzip
-import hashlib
 import importlib.util
 import io
 import json
@@ -8,8 +7,9 @@ import os
 import re
 import time
 from concurrent.futures import Future
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Type
+from typing import Dict, List, NamedTuple, Optional, Set, Type
 from urllib.parse import urlparse
 
 import requests
@@ -46,26 +46,45 @@ rejected_sources: Dict[str, str] = {}
 
 __executor = TaskManager()
 
+
+class UrlKeys(NamedTuple):
+    scheme: str
+    hostname: Optional[str]
+    no_www: str
+    no_www_hostname: Optional[str]
+
+
+@lru_cache(maxsize=4096)
+def __url_keys(url: str) -> UrlKeys:
+    """Parses a url once into every key the crawler lookups use"""
+    parsed_url = urlparse(url)
+    no_www = url.replace("://www.", "://")
+    no_www_hostname = parsed_url.hostname
+    if no_www_hostname and no_www_hostname.startswith("www."):
+        no_www_hostname = urlparse(no_www).hostname
+    return UrlKeys(parsed_url.scheme, parsed_url.hostname, no_www, no_www_hostname)
+
+
 # --------------------------------------------------------------------------- #
 # Loading sources
 # --------------------------------------------------------------------------- #
 
 __cache_crawlers: Dict[Path, List[Type[Crawler]]] = {}
-__url_regex = re.compile(r"^^(https?|ftp)://[^\s/$.?#].[^\s]*$", re.I)
+__url_regex = re.compile(r"^(https?|ftp)://[^\s/$.?#].[^\s]*$", re.I)
 
 
 def __can_do(crawler: Type[Crawler], prop_name: str):
-    if not hasattr(crawler, prop_name):
-        return False
-    if not hasattr(Crawler, prop_name):
-        return True
-    return getattr(crawler, prop_name) != getattr(Crawler, prop_name)
+    # Overridden if any class below Crawler in the MRO defines it itself
+    for klass in crawler.__mro__:
+        if klass is Crawler:
+            return False
+        if prop_name in klass.__dict__:
+            return True
+    return False
 
 
 def __update_rejected(url: str, reason: str):
-    no_www = url.replace("://www.", "://")
-    url_host = urlparse(url).hostname
-    no_www_host = urlparse(no_www).hostname
+    _, url_host, no_www, no_www_host = __url_keys(url)
     rejected_sources.setdefault(url, reason)
     rejected_sources.setdefault(no_www, reason)
     if url_host:
@@ -84,7 +103,8 @@ def __import_crawlers(file_path: Path, no_cache=False) -> List[Type[Crawler]]:
         return []
 
     try:
-        module_name = hashlib.md5(file_path.name.encode()).hexdigest()
+        # Never registered in sys.modules, so it only needs to be readable in tracebacks
+        module_name = f"_lncrawl_src_{file_path.stem}_{hash(str(file_path)) & 0xffffffff:x}"
         spec = importlib.util.spec_from_file_location(module_name, file_path)
         assert spec is not None
         module = importlib.util.module_from_spec(spec)
@@ -111,14 +131,17 @@ def __import_crawlers(file_path: Path, no_cache=False) -> List[Type[Crawler]]:
             continue
 
         urls = getattr(crawler, "base_url", [])
-        urls = [urls] if isinstance(urls, str) else list(urls)
-        urls = list(set([str(url).lower().strip("/") + "/" for url in urls]))
+        urls = list({
+            str(url).lower().strip("/") + "/"
+            for url in ([urls] if isinstance(urls, str) else urls)
+        })
         if not urls:
             continue
-        for url in urls:
-            if not __url_regex.match(url):
-                logger.debug(f"Invalid base url: {url} @{file_path}")
-                continue
+        # Only a diagnostic; it never filters, so skip the regex unless debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            for url in urls:
+                if not __url_regex.match(url):
+                    logger.debug(f"Invalid base url: {url} @{file_path}")
 
         for method in ["read_novel_info", "download_chapter_body"]:
             if not hasattr(crawler, method):
@@ -149,6 +172,18 @@ def __import_crawlers(file_path: Path, no_cache=False) -> List[Type[Crawler]]:
     return crawlers
 
 
+def __iter_source_files(root: str):
+    """Yields source files under root, pruning `_`-prefixed entries before descending"""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.name.startswith("_") or not entry.name[0].isalnum():
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from __iter_source_files(entry.path)
+            elif entry.name.endswith(".py"):
+                yield Path(entry.path)
+
+
 def __add_crawlers_from_path(path: Path, no_cache=False):
     if path.name.startswith("_") or not path.name[0].isalnum():
         return
@@ -157,19 +192,21 @@ def __add_crawlers_from_path(path: Path, no_cache=False):
         return
 
     if path.is_dir():
-        for py_file in path.glob("**/*.py"):
-            __add_crawlers_from_path(py_file, no_cache)
+        for py_file in __iter_source_files(str(path)):
+            __register_crawlers(py_file, no_cache)
         return
 
+    __register_crawlers(path, no_cache)
+
+
+def __register_crawlers(path: Path, no_cache=False):
     try:
         crawlers = __import_crawlers(path, no_cache)
         for crawler in crawlers:
             setattr(crawler, "file_path", str(path.absolute()))
             base_urls: list[str] = getattr(crawler, "base_url")
             for url in base_urls:
-                no_www = url.replace("://www.", "://")
-                hostname = urlparse(url).hostname
-                no_www_hostname = urlparse(no_www).hostname
+                _, hostname, no_www, no_www_hostname = __url_keys(url)
                 crawler_list[url] = crawler
                 crawler_list[no_www] = crawler
                 if hostname:
@@ -211,11 +248,18 @@ def update_sources():
     return 0
 
 
+def __lookup_by_suffix(hostname: str) -> Optional[Type[Crawler]]:
+    # Registered hostnames are keys of crawler_list; walk up one label at a time
+    parts = hostname.split(".")
+    for i in range(1, len(parts) - 1):
+        CrawlerType = crawler_list.get(".".join(parts[i:]))
+        if CrawlerType:
+            return CrawlerType
+    return None
+
+
 def prepare_crawler(url: str, crawler_file: Optional[str] = None) -> Crawler:
-    parsed_url = urlparse(url)
-    hostname = parsed_url.hostname
-    no_www = url.replace("://www.", "://")
-    no_www_hostname = urlparse(no_www).hostname
+    scheme, hostname, no_www, no_www_hostname = __url_keys(url)
     
     if not hostname or not no_www_hostname:
         raise LNException("No crawler defined for empty hostname")
@@ -234,19 +278,13 @@ def prepare_crawler(url: str, crawler_file: Optional[str] = None) -> Crawler:
     )
     
     if not CrawlerType:
-        # Fallback: If we can't find a specific crawler, checks if it's fanmtl
-        # This is a safety net if DNS/Hostname parsing is slightly off
-        if 'fanmtl' in url:
-            # Try to find fanmtl manually in the loaded list
-            for key, val in crawler_list.items():
-                if 'fanmtl' in key:
-                    CrawlerType = val
-                    break
+        # Fallback: match a registered parent domain, e.g. m.fanmtl.com -> fanmtl.com
+        CrawlerType = __lookup_by_suffix(no_www_hostname)
     
     if not CrawlerType:
         raise LNException("No crawler found for " + hostname)
 
-    home_url = f"{parsed_url.scheme}://{hostname}/"
+    home_url = f"{scheme}://{hostname}/"
 
     logger.info(
         f"Initializing crawler for: {home_url} [%s]",
@@ -1,14 +1,53 @@
 # -*- coding: utf-8 -*-
 import logging
-from urllib.parse import urlparse, parse_qs
+import re
+from concurrent.futures import as_completed
+import soupsieve
 from bs4 import BeautifulSoup
-from requests.adapters import HTTPAdapter
+from lxml import etree, html as lxml_html
 from urllib3.util.retry import Retry
 from lncrawl.models import Chapter
 from lncrawl.core.crawler import Crawler
 
 logger = logging.getLogger(__name__)
 
+# Query values on the last pagination link
+PAGE_PARAM = re.compile(r"[?&]page=(\d+)")
+WJM_PARAM = re.compile(r"[?&]wjm=([^&#]*)")
+
+# urllib3 derives a fresh Retry per request via .new(), so one shared policy is safe
+RETRY = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+
+
+def _parse_html(content):
+    # Decoded up front like make_soup does, so libxml2 never guesses the charset
+    return lxml_html.fromstring(content.decode("utf8", "ignore"))
+
+
+# Compiled once so each paginated TOC page runs the same query inside libxml2
+def _has_class(name):
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+CHAPTER_LINKS = etree.XPath(f'//ul[{_has_class("chapter-list")}]//li//a[@href][.//*[{_has_class("chapter-title")}]]')
+CHAPTER_TITLE = etree.XPath(f'string(.//*[{_has_class("chapter-title")}])')
+
+# Chapter pages are parsed by libxml2 alone; only the content node is handed to bs4 for cleaning
+CHAPTER_BODY = etree.XPath(f'//*[@id="chapter-article"]//*[{_has_class("chapter-content")}]')
+
+# Per-row and per-chapter selectors, compiled once instead of looked up on every call
+TOC_LINK_SELECTOR = soupsieve.compile("ul.chapter-list li a[href]")
+TOC_TITLE_SELECTOR = soupsieve.compile(".chapter-title")
+
+# Novel page selectors, compiled once for every novel this process reads
+TITLE_SELECTOR = soupsieve.compile("h1.novel-title")
+OG_TITLE_SELECTOR = soupsieve.compile('meta[property="og:title"]')
+COVER_SELECTOR = soupsieve.compile("figure.cover img")
+FALLBACK_COVER_SELECTOR = soupsieve.compile(".fixed-img img")
+AUTHOR_SELECTOR = soupsieve.compile('.novel-info .author span[itemprop="author"]')
+SUMMARY_SELECTOR = soupsieve.compile(".summary .content")
+PAGINATION_SELECTOR = soupsieve.compile('.pagination a[data-ajax-update="#chpagedlist"]')
+
 class FanMTLCrawler(Crawler):
     has_mtl = True
     base_url = "https://www.fanmtl.com/"
@@ -17,40 +56,55 @@ class FanMTLCrawler(Crawler):
         self.init_executor(8)
         self.cleaner.bad_css.update({'div[align="center"]'})
 
-        retry = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=retry)
-        self.scraper.mount("https://", adapter)
-        self.scraper.mount("http://", adapter)
+        # Keep the connection pool as wide as the executor; survives cloudscraper's cipher rotation
+        self.init_connection_pool(self.workers, max_retries=RETRY)
 
     def read_novel_info(self):
         logger.debug("Visiting %s", self.novel_url)
         soup = self.get_soup(self.novel_url)
 
-        possible_title = soup.select_one("h1.novel-title")
+        possible_title = TITLE_SELECTOR.select_one(soup)
         if possible_title:
             self.novel_title = possible_title.text.strip()
         else:
-            meta_title = soup.select_one('meta[property="og:title"]')
+            meta_title = OG_TITLE_SELECTOR.select_one(soup)
             self.novel_title = meta_title.get("content").strip() if meta_title else "Unknown Title"
 
-        img_tag = soup.select_one("figure.cover img") or soup.select_one(".fixed-img img")
+        img_tag = COVER_SELECTOR.select_one(soup) or FALLBACK_COVER_SELECTOR.select_one(soup)
         if img_tag:
             url = img_tag.get("src")
             if "placeholder" in str(url) and img_tag.get("data-src"):
                 url = img_tag.get("data-src")
             self.novel_cover = self.absolute_url(url)
 
-        author_tag = soup.select_one('.novel-info .author span[itemprop="author"]')
+        author_tag = AUTHOR_SELECTOR.select_one(soup)
         self.novel_author = author_tag.text.strip() if author_tag else "Unknown"
 
-        summary_div = soup.select_one(".summary .content")
-        self.novel_synopsis = summary_div.get_text("\n\n").strip() if summary_div else ""
+        # One text run per paragraph, so inline tags no longer split a paragraph into several;
+        # bare text or other tags outside any <p> keep the full get_text join so nothing is dropped
+        summary_div = SUMMARY_SELECTOR.select_one(soup)
+        self.novel_synopsis = ""
+        if summary_div:
+            paragraphs = []
+            for child in summary_div.children:
+                name = getattr(child, "name", None)
+                if name == "p":
+                    text = child.get_text().strip()
+                    if text:
+                        paragraphs.append(text)
+                elif name or child.strip():
+                    paragraphs = None
+                    break
+            if paragraphs is None:
+                self.novel_synopsis = summary_div.get_text("\n\n").strip()
+            else:
+                self.novel_synopsis = "\n\n".join(paragraphs)
 
         self.volumes = [{"id": 1, "title": "Volume 1"}]
         self.chapters = []
 
         # --- PAGINATION LOGIC ---
-        pagination_links = soup.select('.pagination a[data-ajax-update="#chpagedlist"]')
+        pagination_links = PAGINATION_SELECTOR.select(soup)
         
         if not pagination_links:
             # If no pagination, it's < 100 chapters. Parse current page.
@@ -60,42 +114,71 @@ class FanMTLCrawler(Crawler):
                 last_page = pagination_links[-1]
                 href = last_page.get("href")
                 common_url = self.absolute_url(href).split("?")[0]
-                query = parse_qs(urlparse(href).query)
-                
-                # Safe extraction logic
-                page_params = query.get("page", ["0"])
-                page_count = int(page_params[0]) + 1
-                
-                wjm_params = query.get("wjm", [""])
-                wjm = wjm_params[0]
-
-                futures = []
-                for page in range(page_count):
-                    url = f"{common_url}?page={page}&wjm={wjm}"
-                    futures.append(self.executor.submit(self.get_soup, url))
-                
-                for page_soup in self.resolve_futures(futures, desc="TOC", unit="page"):
-                    self.parse_chapter_list(page_soup)
+
+                # Safe extraction logic; wjm keeps its original encoding for the rebuilt urls
+                page_match = PAGE_PARAM.search(href)
+                page_count = int(page_match.group(1)) + 1 if page_match else 1
+
+                wjm_match = WJM_PARAM.search(href)
+                wjm = wjm_match.group(1) if wjm_match else ""
+
+                # The novel page already lists page 0; only fetch it again if that list came back empty
+                pages = [None] * page_count
+                pages[0] = self.soup_toc_rows(soup)
+                futures = {
+                    self.executor.submit(self.get_toc_rows, f"{common_url}?page={page}&wjm={wjm}"): page
+                    for page in range(0 if not pages[0] else 1, page_count)
+                }
+
+                # Slot each page in as it lands, then number chapters in reading order
+                for future in as_completed(futures):
+                    try: pages[futures[future]] = future.result()
+                    except Exception as e: logger.warning(f"TOC page {futures[future]} failed: {e}")
+                for rows in pages:
+                    self.add_chapter_rows(rows)
             except Exception as e:
                 logger.error(f"Pagination failed: {e}. Parsing current page.")
                 self.parse_chapter_list(soup)
 
-        self.chapters.sort(key=lambda x: x["id"] if isinstance(x, dict) else getattr(x, "id", 0))
+    def chapter_url(self, href, page_url=None):
+        """absolute_url with a fast path for the root-relative and absolute hrefs FanMTL emits"""
+        href = href.strip().rstrip("/")
+        if href.startswith("/") and not href.startswith("//"):
+            return self.home_url.strip("/") + href
+        if href.startswith(("https://", "http://")):
+            return href
+        return self.absolute_url(href, page_url)
+
+    def get_toc_rows(self, url):
+        """Fetches a TOC page and extracts its (href, title) rows with lxml, skipping the soup build"""
+        response = self.get_response(url, headers={"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9"})
+        tree = _parse_html(response.content)
+        return [(self.chapter_url(a.get("href"), url), CHAPTER_TITLE(a).strip()) for a in CHAPTER_LINKS(tree)]
+
+    def soup_toc_rows(self, soup):
+        # Rows without a link or a title are skipped, as before, without an exception per row
+        return [
+            (a["href"], title.text.strip())
+            for a in TOC_LINK_SELECTOR.select(soup)
+            if (title := TOC_TITLE_SELECTOR.select_one(a))
+        ]
 
     def parse_chapter_list(self, soup):
         if not soup: return
-        for a in soup.select("ul.chapter-list li a"):
-            try:
-                self.chapters.append(Chapter(
-                    id=len(self.chapters) + 1,
-                    volume=1,
-                    url=self.absolute_url(a["href"]),
-                    title=a.select_one(".chapter-title").text.strip(),
-                ))
-            except: pass
+        self.add_chapter_rows(self.soup_toc_rows(soup))
+
+    def add_chapter_rows(self, rows):
+        if not rows: return
+        start = len(self.chapters) + 1
+        chapter_url = self.chapter_url
+        self.chapters.extend(
+            Chapter(id=start + i, volume=1, url=chapter_url(href), title=title)
+            for i, (href, title) in enumerate(rows)
+        )
 
     def download_chapter_body(self, chapter):
-        soup = self.get_soup(chapter["url"])
-        body = soup.select_one("#chapter-article .chapter-content")
-        if not body: return None
-        return self.cleaner.extract_contents(body)
+        response = self.get_response(chapter["url"], headers={"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9"})
+        nodes = CHAPTER_BODY(_parse_html(response.content))
+        if not nodes: return None
+        soup = BeautifulSoup(lxml_html.tostring(nodes[0], encoding="unicode", with_tail=False), "lxml")
+        return self.cleaner.extract_contents(soup.body.find())